@@ -3,46 +3,89 @@
 # Generates a bash template for scripting.
 
 
-import os
 import sys
-import re
+import shlex
 import argparse
+import collections
+import csv
+import functools
 from datetime import date
-from string import ascii_lowercase
+from string import ascii_lowercase, ascii_uppercase
+
+
+class _UpperTable(dict):
+  """ Translation table for str.translate that deletes any character it
+  does not map.
+  """
+  def __missing__(self, key):
+    return None
+
+
+# Uppercases letters and keeps underscores, anything else not allowed in a
+# bash variable name is deleted
+_UP_TABLE = _UpperTable({ord(c): ord(c.upper()) for c in ascii_lowercase})
+_UP_TABLE.update({ord(c): ord(c) for c in ascii_uppercase + "_"})
+
+_LOWER = frozenset(ascii_lowercase)
+_BOOL_MAP = {"true":True, "false":False,
+             "t":True, "f":False,
+             "yes":True, "no":False,
+             "y":True, "n":False}
+_BUILDER_COMMANDS = {"a":"add", "b":"batch", "x":"exit"}
+
+_EOF_MSG = "\nUnexpected end of input, exiting"
+
+# Immutable snapshot of the parsed command line options
+Opts = collections.namedtuple("Opts", "strict no_color cleanup amend_parameters "
+                                      "variable_lowercase reuse_answers")
+
+# Optional script boilerplate, see add_boilerplate
+_STRICT_LINE = "set -Eeuo pipefail \n"
+
+_CLEANUP = """\
+trap cleanup SIGINT SIGTERM ERR EXIT 
+
+cleanup() {
+  trap - SIGINT SIGTERM ERR EXIT
+  # TODO: Script cleanup here
+} \n\n"""
+
+_COLORS_FUNCTION = """\
+setup_colors() {
+  if  [[ -t 2 ]] && [[ -z "${NO_COLOR-}" ]] && [[ "${TERM-}" != "dumb" ]]; then
+    NOFORMAT='\\033[0m' RED='\\033[0;31m' GREEN='\\033[0;32m' ORANGE='\\033[0;33m' BLUE='\\033[0;34m' PURPLE='\\033[0;35m' CYAN='\\033[0;36m' YELLOW='\\033[1;33m'
+  else
+    NOFORMAT='' RED='' GREEN='' ORANGE='' BLUE='' PURPLE='' CYAN='' YELLOW=''
+  fi
+} \n\n"""
 
 
 def main():
   args = parse_arguments()
-  content = ""
+  parts = []
 
   descriptions = get_script_descriptions(args)
 
-  content += add_headers(args, descriptions)
-  content += add_useful_vars(args)
-  content += add_safety(args)
-  content += add_cleanup_function(args)
+  parts.append(add_headers(args, descriptions))
+  parts.append(add_useful_vars(args))
+  parts.append(add_boilerplate(args))
 
   flags_data = get_flags_data(args)
-  content += add_flags_data(args, flags_data, descriptions)
-  content += add_flags_functions(args)
+  parts.append(add_flags_data(args, flags_data, descriptions))
+  parts.append(add_flags_functions(args, flags_data))
 
-  content += add_colors_function(args)
-  content += call_functions(args)
-  content += "\n# SCRIPT STARTS HERE\n"
+  parts.append(call_functions(args))
+  parts.append("\n# SCRIPT STARTS HERE\n")
 
-  create_script(content)
+  create_script("".join(parts))
 
 
 # Ask user for script name and create script
 def create_script(content):
   script_name = sanitize_input("Script name (don't add extension): ",
                                lambda x: (x + ".sh"))
-  if os.path.exists(script_name):
-    f = open(script_name, "w")
-  else:
-    f = open(script_name, "x")
-  f.write(content)
-  f.close()
+  with open(script_name, "w", buffering=1<<16) as f:
+    f.write(content)
 
 
 def get_script_descriptions(args):
@@ -54,6 +97,17 @@ def get_script_descriptions(args):
   if not add_descriptions:
     return descriptions
 
+  if not sys.stdin.isatty():
+    # Piped input, read both descriptions without prompting. Blank lines keep
+    # the TODO placeholders.
+    for key in ("short", "long"):
+      line = sys.stdin.readline()
+      if not line:
+        sys.exit(_EOF_MSG)
+      if line.strip():
+        descriptions[key] = line.rstrip("\n")
+    return descriptions
+
   descriptions["short"] = sanitize_input("Short description: ") 
   descriptions["long"] = sanitize_input("Long description: ") 
   return descriptions
@@ -64,23 +118,24 @@ def add_headers(args, descriptions):
   """
   
   prefix = "# "
-  skip_line = prefix + "\n"
-
-  header = "#!/usr/bin/env bash\n#\n"
-  header += prefix 
-  header += descriptions["short"] + "\n" + skip_line
 
   formatted_long_description = \
     split_string_length(descriptions["long"], 79 - len(prefix), prefix) 
-  header += prefix + formatted_long_description
-
-  header += prefix + "\n"
+  today_str = date.today().strftime("%m/%d/%Y")
+  author = sanitize_input("Author: ")
 
-  today = date.today()
-  header += prefix + "Date Created: " + today.strftime("%m/%d/%Y")
-  header += """
+  header = f"""\
+#!/usr/bin/env bash
+#
+# {descriptions["short"]}
+# 
+# {formatted_long_description}# 
+# Date Created: {today_str}
 # 
-# Author(s): """ + input("Author: ") + "\n\n\n"
+# Author(s): {author}
+
+
+"""
 
   return header
 
@@ -103,67 +158,29 @@ script_dir="$( cd "$( dirname "${BASH_SOURCE[0]}" )" >/dev/null 2>&1 && pwd )"
   return useful_vars
 
 
-def add_safety(args):
-  """ Adds line to prevent runaway (disabled by default since most people
-  do not expect these options turned on).
-
-  Also adds in cleanup.
-  """
-  
-  safety_lines = ""
-  if args.strict:
-    safety_lines += "set -Eeuo pipefail \n" 
-
-  if args.cleanup: 
-    safety_lines += "trap cleanup SIGINT SIGTERM ERR EXIT \n\n"
-
-  return safety_lines
-
-
-def add_colors_function(args):
-  """ Adds in color function for nice printing.
-  """
-
-  if args.no_color: 
-    return ""
-
-  color_function = """\
-setup_colors() {
-  if  [[ -t 2 ]] && [[ -z "${NO_COLOR-}" ]] && [[ "${TERM-}" != "dumb" ]]; then
-    NOFORMAT='\\033[0m' RED='\\033[0;31m' GREEN='\\033[0;32m' ORANGE='\\033[0;33m' BLUE='\\033[0;34m' PURPLE='\\033[0;35m' CYAN='\\033[0;36m' YELLOW='\\033[1;33m'
-  else
-    NOFORMAT='' RED='' GREEN='' ORANGE='' BLUE='' PURPLE='' CYAN='' YELLOW=''
-  fi
-} \n\n"""
-  
-  return color_function
-
-
-def add_cleanup_function(args):
-  """ Adds in cleanup function that was setup in the add_safety function.
+def add_boilerplate(args):
+  """ Adds lines to prevent runaway (disabled by default since most people
+  do not expect these options turned on), the cleanup function and the color
+  function for nice printing.
   """
-  if not args.cleanup:
-    return ""
-
-  cleanup_function = """ \
-cleanup() {
-  trap - SIGINT SIGTERM ERR EXIT
-  # TODO: Script cleanup here
-} \n\n"""
-
-  return cleanup_function
+  return "".join((_STRICT_LINE if args.strict else "",
+                  _CLEANUP if args.cleanup else "",
+                  "" if args.no_color else _COLORS_FUNCTION))
 
 
 def get_flags_data(args):
   """ Get flag data from user.
   """
   flag_data = []
+  # Answers reused across flags with --reuse_answers, scoped to this session
+  reused_answers = {}
   
   prompt = """ \
 Argument Builder Commands:
 Dynamically creates flags for bash scripts. Note that you can skip this and call this script later on for adding additional 
 flags.
   A - Add Argument
+  B - Batch Add Arguments
   X - Exit Builder
 
 Command: """
@@ -176,77 +193,132 @@ Command: """
   flag_data.append(help_data)
 
   while (True):
-    exit = sanitize_input(prompt, 
-                            lambda x: ({"a":False,"x":True}[x.lower()]))
-    if exit:
+    command = sanitize_input(prompt, lambda x: _BUILDER_COMMANDS[x.lower()])
+    if command == "exit":
       break
-    flag_data.append(get_individual_flag_data(args))
+    if command == "batch":
+      batch_data = get_batch_flags_data(args)
+      flag_data.extend(batch_data)
+      print(str(len(batch_data)) + " flag(s) added...")
+      continue
+    flag_data.append(get_individual_flag_data(args, reused_answers))
     print("Flag added...")
   
   return flag_data
 
 
-def get_individual_flag_data(args):
+def get_batch_flags_data(args):
+  """ Get flag data from user, one comma separated line per flag in the form
+  of short,varname,takes_value,mandatory,description.
+
+  Reading stops on an empty line. Invalid lines are skipped.
+  """
+  print("Enter flags as short,varname,takes_value,mandatory,description "
+        "(empty line to finish):")
+  lines = []
+  while (True):
+    try:
+      line = input()
+    except EOFError:
+      sys.exit(_EOF_MSG)
+    except KeyboardInterrupt:
+      sys.exit("\nExiting")
+    if not line.strip():
+      break
+    lines.append(line)
+
+  flag_data = []
+  for line in lines:
+    # Each line is parsed on its own so a malformed line, such as an unclosed
+    # quote, can not run into the next one
+    try:
+      fields = next(csv.reader([line], skipinitialspace=True, strict=True))
+      if len(fields) != 5:
+        raise ValueError
+      short, varname, takes_value, mandatory, description = fields
+      flag_data.append({"short": check_lowercase_alpha(short),
+                        "varname": check_uppercase_underscored(varname),
+                        "takes_value": _BOOL_MAP[takes_value.lower()],
+                        "mandatory": _BOOL_MAP[mandatory.lower()],
+                        "description": description})
+    except (KeyError, ValueError, csv.Error):
+      print("Invalid Input: " + line)
+  return flag_data
+
+
+def get_individual_flag_data(args, reused_answers):
   data = {}
 
   data['short'] = sanitize_input("Short hand (a-z): ", check_lowercase_alpha)
   data['varname'] = sanitize_input("Variable Name: ", check_uppercase_underscored)
-  data['takes_value'] = input_bool("Should flag take value? ")
-  data['mandatory'] = input_bool("Mandatory Variable? ")
+  if args.reuse_answers:
+    data['takes_value'] = input_bool_reused("Should flag take value? ",
+                                            reused_answers)
+    data['mandatory'] = input_bool_reused("Mandatory Variable? ",
+                                          reused_answers)
+  else:
+    data['takes_value'] = input_bool("Should flag take value? ")
+    data['mandatory'] = input_bool("Mandatory Variable? ")
   data['description'] = sanitize_input("Help description: ")
   return data
 
 
 def add_flags_data(args, flags_data, descriptions):
-  flag_var_strings = ""
-  parameter_string = "getopts_parameter_string=\":" # Default getopts param
-  mandatory_string = "mandatory_flags=\""
-  usage_help_string = "Usage: $script_name"
-  full_optional_help_string = "optional arguments:\n"
-  full_required_help_string = "required arguments:\n"
+  flag_var_strings = []
+  usage_prefix = "Usage: $script_name"
+  usage_help_words = usage_prefix.split(" ")
+  full_optional_help_string = ["optional arguments:\n"]
+  full_required_help_string = ["required arguments:\n"]
 
   for flag_data in flags_data:
     variable = "flag_" + flag_data['short'] + "_string"
-    if flag_data['short'] != "h":
-      flag_var_strings += variable + "=\"-" + flag_data['short'] + " " + flag_data['varname'] + "\"\n"
+    # Flag strings are known here, so they are written into the help text
+    # directly rather than expanded by bash at runtime
+    if flag_data['short'] == "h":
+      flag_text = "-h"
+    else:
+      flag_text = "-" + flag_data['short'] + " " + flag_data['varname']
+      flag_var_strings.append(variable + "=\"" + flag_text + "\"\n")
 
-    parameter_string += flag_data['short'] 
-    if flag_data['takes_value']:
-      parameter_string += ":"
     if flag_data['mandatory']:
-      usage_help_string += " $" + variable
-      mandatory_string += flag_data['short']
-      full_required_help_string += "$" + variable + """
-                             """ + split_string_length(flag_data["description"], 50)
+      usage_help_words.append(flag_text)
+      full_required_help_string.append(flag_text + """
+                             """ + split_string_length(flag_data["description"], 50))
     else:
-      if flag_data['short'] == "h":
-        usage_help_string += " [-h]"
-        full_optional_help_string += "-h"
-      else:
-        usage_help_string += " [$" + variable + "]"
-        full_optional_help_string += "$" + variable
-      full_optional_help_string += """
-                             """ + split_string_length(flag_data["description"], 50)
-
-  parameter_string += "\""
-  mandatory_string += "\""
+      usage_help_words.append("[" + flag_text + "]")
+      full_optional_help_string.append(flag_text + """
+                             """ + split_string_length(flag_data["description"], 50))
+
+  flag_var_strings = "".join(flag_var_strings)
+  # Leading ":" is the default getopts param for silent error reporting
+  parameter_string = "getopts_parameter_string=\":" + "".join(
+    f['short'] + (":" if f['takes_value'] else "") for f in flags_data) + "\""
+  mandatory_string = "mandatory_flags=\"" + "".join(
+    f['short'] for f in flags_data if f['mandatory']) + "\""
+  full_optional_help_string = "".join(full_optional_help_string)
+  full_required_help_string = "".join(full_required_help_string)
+
   flag_string = """\
 # Flag strings
 """ + flag_var_strings + "\n" 
   flag_string += parameter_string + "\n"
   flag_string += mandatory_string + "\n"
 
-  usage_string = "usage_help=$(cat <<EOF\n" + split_string_length(usage_help_string, 80) + "EOF\n)\n"
-    
-  full_help_string = "full_help=$(cat <<EOF\n" + split_string_length(descriptions["long"], 120)
-  full_help_string += "\n" + full_optional_help_string + "\n" + full_required_help_string + """
-EOF
-)\n"""
+  # Only $script_name is left for bash to expand, everything else is quoted
+  # as a literal. Flags are wrapped as whole words so none is split across
+  # lines.
+  usage_text = split_words_length(usage_help_words, 80).rstrip("\n")
+  usage_string = "usage_help=\"" + usage_prefix + "\"" \
+    + shlex.quote(usage_text[len(usage_prefix):]) + "\n"
+
+  full_help_text = split_string_length(descriptions["long"], 120) + "\n" \
+    + full_optional_help_string + "\n" + full_required_help_string
+  full_help_string = "full_help=" + shlex.quote(full_help_text.rstrip("\n")) + "\n"
 
   return flag_string + "\n" + usage_string + "\n" + full_help_string + "\n"
 
 
-def add_flags_functions(args):
+def add_flags_functions(args, flags_data):
   flag_functions = """\
 # Checks to see if manadatory flag is present and if not, show usage help and
 # throw error exit code.
@@ -261,50 +333,41 @@ function check_mandatory_flag() {
   fi
 }
 
+# Flag characters accepted by getopts, computed once at startup
+active_flags="${getopts_parameter_string//:/}"
+
 # Loops through all manadatory flags to see if specified
 function check_all_mandatory_flags() {
-  for char in {a..z} {0..9}
+  for ((i=0;i<${#mandatory_flags};i++))
   do
-    if [[ $mandatory_flags =~ $char ]]; then
-      eval 'check_mandatory_flag $flag_'$char' $flag_'$char'_string'
-    fi
+    char="${mandatory_flags:i:1}"
+    eval 'check_mandatory_flag $flag_'$char' $flag_'$char'_string'
   done
 }
 
 # Intialize all getopts flag counters equal to 0
 function initialize_flag_counters() {
-  for char in {a..z} {0..9}
+  for ((i=0;i<${#active_flags};i++))
   do
-    if [[ $getopts_parameter_string =~ $char ]]; then
-      eval 'flag_'$char'=0'
-    fi
+    char="${active_flags:i:1}"
+    eval 'flag_'$char'=0'
   done
 }
 
-# Sum up all the flag counters
-function sum_exp6_flags() {
-  SUM_EXP6=0
-  for char in {a..z} {0..9}
-  do
-    if [[ $getopts_parameter_string =~ $char ]]; then
-      eval 'SUM_EXP6=$((SUM_EXP6+flag_'$char'**6))'
-    fi
-  done
-}
-
-# Add the flag counters and assign variable based on flag string
-# Args:
-#     $1 - option char (e.g. a, b, c, etc.)
-#     $2 - value assignment (e.g ${OPTARG})
-function add_assign_getopts() {
-  eval 'var_name=${flag_'$1'_string#*[[:blank:]]}'
-  [[ -z "${2// }" ]] && eval $var_name'='True || eval $var_name'='$2
-  eval 'flag_'$1'=$((flag_'$1'+1))'
-}
-
 initialize_flag_counters
+declare -A _seen=()
 while getopts $getopts_parameter_string option
 do
+  # Each flag may only be given once
+  if [[ -n "${_seen[$option]:-}" ]]; then
+    current_flag_index=$(($OPTIND-2))
+    echo "Replicate flag: ${!current_flag_index} has already been"\\
+    "specified"
+    echo "$usage_help"
+    exit $replicate_flag_code
+  fi
+  _seen[$option]=1
+
   case "${option}" in
 
     h )
@@ -318,34 +381,28 @@ do
     echo $usage_help
     exit $missing_argument_code;;
 
-    * )
-    # Assign and add flag counter for parameter, if
-    # in getopts_parameter_string
-    if [[ $getopts_parameter_string =~ ${option} ]]; then
-      add_assign_getopts "${option}" ${OPTARG}
-    fi
-    # The following line is a trick used to see if any of the flags have been
-    # defined twice. By exponentiating all flag counters by 6, unless there are
-    # more short arguments defined, a summed counter value of all flags should
-    # only be 36 as there are only 36 alpha-numeral characters. We chose the
-    # lowest number to exponentiate by to prevent accidental overloading.
-    sum_exp6_flags
-    if [[ $SUM_EXP6 -gt 36 ]]; then
-      current_flag_index=$(($OPTIND-2))
-      echo "Replicate flag: ${!current_flag_index} has already been"\\
-      "specified"
-      echo "$usage_help"
-      exit $replicate_flag_code
-    fi;;&
-
-    \? )
+    \\? )
     echo Not a valid option
     echo $usage_help
     exit $invalid_argument_code;;
+"""
+
+  # Assign variable and add flag counter for each user defined flag
+  case_arms = []
+  for flag_data in flags_data:
+    short = flag_data['short']
+    if short == "h":
+      continue
+    value = "\"${OPTARG}\"" if flag_data['takes_value'] else "True"
+    case_arms.append("""
+    """ + short + """ )
+    """ + flag_data['varname'] + "=" + value + """
+    flag_""" + short + "=$((flag_" + short + "+1));;\n")
+
+  return flag_functions + "".join(case_arms) + """\
   esac
 done
 \n"""
-  return flag_functions
 
 
 def call_functions(args):
@@ -357,7 +414,7 @@ def check_lowercase_alpha(letter):
 
   If not, a KeyError is thrown.
   """
-  if letter in ascii_lowercase:
+  if letter in _LOWER:
     return letter
   raise KeyError
   
@@ -367,19 +424,20 @@ def check_uppercase_underscored(varname):
 
   We force that all variable names be uppercase for clarity sake.
   """
-  # Check for variable name contains only underscores and letters
-  if re.match("[^_|^a-z|^A-Z]", varname):
+  # Uppercase and drop invalid characters in a single pass, the variable name
+  # may only contain underscores and letters
+  upper_varname = varname.translate(_UP_TABLE)
+  if len(upper_varname) != len(varname):
     raise KeyError
-    return
 
-  if varname.upper() != varname:
+  if upper_varname != varname:
     print("Variable name: " + varname + """ should be in all caps, forcing uppercase. 
           If you would like to disable this feature see help.""")
 
-  return varname.upper()
+  return upper_varname
 
 
-def parse_arguments():
+def _build_parser():
   parser = argparse.ArgumentParser(description='Generates a bash boilerplate.')
   parser.add_argument('-s', '--strict', action='store_true',
                       help="""Adds in strict requieements for bash scripting, 
@@ -409,15 +467,35 @@ def parse_arguments():
                       they should essentially be constants. If this flag is used, variable
                       names will be created as is.""")
 
-  return parser.parse_args()
+  parser.add_argument('-r', '--reuse_answers', action='store_true',
+                      help="""Only ask once whether flags take a value and
+                      whether they are mandatory, reusing the first answers for
+                      every flag added afterwards.""")
+
+  return parser
+
+
+# Built once at import so repeated parsing reuses the same parser
+_PARSER = _build_parser()
+
+
+def parse_arguments(argv=None):
+  return Opts(**vars(_PARSER.parse_args(argv)))
 
 
 def input_bool(prompt):
-  return sanitize_input(prompt, 
-    lambda x: ({"true":True, "false":False,
-                "t":True, "f":False,
-                "yes":True, "no":False,
-                "y":True, "n":False}[x.lower()]))
+  return sanitize_input(prompt, lambda x: _BOOL_MAP[x.lower()])
+
+
+def input_bool_reused(prompt, answers):
+  """ Asks prompt only once per builder session, printing the earlier answer
+  from answers when it is reused.
+  """
+  if prompt in answers:
+    print(prompt + str(answers[prompt]) + " (reused)")
+  else:
+    answers[prompt] = input_bool(prompt)
+  return answers[prompt]
 
 
 def sanitize_input(prompt, filter_func=lambda x:x, error_msg="Invalid Input."):
@@ -426,25 +504,35 @@ def sanitize_input(prompt, filter_func=lambda x:x, error_msg="Invalid Input."):
       return filter_func(input(prompt))
     except KeyError:
       print(error_msg)
+    except EOFError:
+      sys.exit(_EOF_MSG)
     except KeyboardInterrupt:
       sys.exit("\nExiting")
 
 
+@functools.lru_cache(maxsize=None)
 def split_string_length(string, max_length, prefix=""):
-  words = string.split(" ")
+  return split_words_length(tuple(string.split(" ")), max_length, prefix)
+
+
+def split_words_length(words, max_length, prefix=""):
+  """ Same as split_string_length, but each given word is kept whole even if
+  it contains spaces.
+  """
   sentence_length = 0
-  split_string = ""
+  chunks = []
 
   for word in words:
-    if sentence_length + len(word) > max_length:
-      split_string += "\n" + prefix + word + " "
+    wl = len(word)
+    if sentence_length + wl > max_length:
+      chunks.append("\n" + prefix + word + " ")
       sentence_length = 0
     else:
-      split_string += word + " "
+      chunks.append(word + " ")
 
-    sentence_length += len(word) + 1 # Include the space
+    sentence_length += wl + 1 # Include the space
 
-  return split_string + "\n"
+  return "".join(chunks) + "\n"
 
 
 if __name__ == "__main__":